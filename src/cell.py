@@ -15,10 +15,15 @@ from skimage.draw import polygon
 # from skimage.draw import circle, polygon
 from scipy.ndimage import gaussian_filter
 
-from drawing import draw_arc, draw_line, circle
+from drawing import arc_coords, line_coords, circle
 from mathhelper import Rectangle, Vector
 
 
+# integer tags of the supported cell types, resolved once from "global.cellType"
+BACILLI = 0
+CELL_TYPES = {'bacilli': BACILLI}
+
+
 class Cell():
     """The Cell class stores information about a particular cell."""
 
@@ -268,29 +273,38 @@ class Bacilli(Cell):
 
 
 
-    def drawoutline(self, image, color):
-        """Draws the outline of the cell over a color image."""
+    def outline_coords(self):
+        """Returns the (ys, xs) pixel coordinates of the outline of the cell."""
         if self._needs_refresh:
             self._refresh()
 
-        draw_line(image, int(self._tail_left.x), int(self._tail_left.y),
-                         int(self._head_left.x), int(self._head_left.y), color)
-        draw_line(image, int(self._tail_right.x), int(self._tail_right.y),
-                         int(self._head_right.x), int(self._head_right.y), color)
-
         r0 = self._head_right - self._head_center
         r1 = self._head_left - self._head_center
-        t1 = atan2(r0.y, r0.x)
-        t0 = atan2(r1.y, r1.x)
-        draw_arc(image, self._head_center.x, self._head_center.y,
-                        self._width/2, t0, t1, color)
+        head_t0 = atan2(r1.y, r1.x)
+        head_t1 = atan2(r0.y, r0.x)
 
         r0 = self._tail_right - self._tail_center
         r1 = self._tail_left - self._tail_center
-        t0 = atan2(r0.y, r0.x)
-        t1 = atan2(r1.y, r1.x)
-        draw_arc(image, self._tail_center.x, self._tail_center.y,
-                        self._width/2, t0, t1, color)
+        tail_t0 = atan2(r0.y, r0.x)
+        tail_t1 = atan2(r1.y, r1.x)
+
+        outline = [
+            line_coords(int(self._tail_left.x), int(self._tail_left.y),
+                        int(self._head_left.x), int(self._head_left.y)),
+            line_coords(int(self._tail_right.x), int(self._tail_right.y),
+                        int(self._head_right.x), int(self._head_right.y)),
+            arc_coords(self._head_center.x, self._head_center.y,
+                       self._width/2, head_t0, head_t1),
+            arc_coords(self._tail_center.x, self._tail_center.y,
+                       self._width/2, tail_t0, tail_t1)]
+        ys = np.concatenate([part[0] for part in outline])
+        xs = np.concatenate([part[1] for part in outline])
+        return ys, xs
+
+    def drawoutline(self, image, color):
+        """Draws the outline of the cell over a color image."""
+        ys, xs = self.outline_coords()
+        image[ys, xs] = color
 
     def split(self, alpha):
         """Splits a cell into two cells with a ratio determined by alpha."""
@@ -11,60 +11,59 @@ import numpy as np
 
 from math import cos, pi, sin, sqrt, floor, ceil
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None
 
-def _draw_line_low(array, x0, y0, x1, y1, color):
-    dx = x1 - x0
-    dy = y1 - y0
-    yi = 1
-    if dy < 0:
-        yi = -1
-        dy = -dy
-    D = 2*dy - dx
-    y = y0
-
-    for x in range(x0, x1 + 1):
-        array[y,x] = color
-        if D > 0:
-            y += yi
-            D -= 2*dx
-        D += 2*dy
-
-
-def _draw_line_high(array, x0, y0, x1, y1, color):
-    dx = x1 - x0
-    dy = y1 - y0
-    xi = 1
-    if dx < 0:
-        xi = -1
-        dx = -dx
-    D = 2*dx - dy
-    x = x0
-
-    for y in range(y0, y1 + 1):
-        array[y,x] = color
-        if D > 0:
-            x += xi
-            D -= 2*dy
-        D += 2*dx
 
-
-def draw_line(array, x0, y0, x1, y1, color):
-    """Draws a line on the numpy array with the specified color."""
+def _line_into(ys, xs, n, x0, y0, x1, y1):
+    """Writes the pixels of a Bresenham line into ys/xs from index n on; returns the new end."""
     if abs(y1 - y0) < abs(x1 - x0):
         if x0 > x1:
-            _draw_line_low(array, x1, y1, x0, y0, color)
-        else:
-            _draw_line_low(array, x0, y0, x1, y1, color)
+            x0, y0, x1, y1 = x1, y1, x0, y0
+        dx = x1 - x0
+        dy = y1 - y0
+        yi = 1
+        if dy < 0:
+            yi = -1
+            dy = -dy
+        D = 2*dy - dx
+        y = y0
+
+        for x in range(x0, x1 + 1):
+            ys[n] = y
+            xs[n] = x
+            n += 1
+            if D > 0:
+                y += yi
+                D -= 2*dx
+            D += 2*dy
     else:
         if y0 > y1:
-            _draw_line_high(array, x1, y1, x0, y0, color)
-        else:
-            _draw_line_high(array, x0, y0, x1, y1, color)
-
-
-def draw_arc(array, x, y, radius, theta0, theta1, color):
-    """Draws an arc on the numpy array with the specified color."""
-    num_steps = int(round(2*radius))
+            x0, y0, x1, y1 = x1, y1, x0, y0
+        dx = x1 - x0
+        dy = y1 - y0
+        xi = 1
+        if dx < 0:
+            xi = -1
+            dx = -dx
+        D = 2*dx - dy
+        x = x0
+
+        for y in range(y0, y1 + 1):
+            ys[n] = y
+            xs[n] = x
+            n += 1
+            if D > 0:
+                x += xi
+                D -= 2*dy
+            D += 2*dx
+    return n
+
+
+def _arc_into(ys, xs, n, x, y, radius, theta0, theta1, num_steps):
+    """Writes the pixels of an arc into ys/xs from index n on; returns the new end."""
     if theta0 > theta1:
         theta0 -= 2*pi
     dt = (theta1 - theta0)/num_steps
@@ -75,7 +74,45 @@ def draw_arc(array, x, y, radius, theta0, theta1, color):
         y0 = int(radius*sin(t0) + y)
         x1 = int(radius*cos(t1) + x)
         y1 = int(radius*sin(t1) + y)
-        draw_line(array, x0, y0, x1, y1, color)
+        n = _line_into(ys, xs, n, x0, y0, x1, y1)
+    return n
+
+
+if njit is not None:
+    _line_into = njit(cache=True)(_line_into)
+    _arc_into = njit(cache=True)(_arc_into)
+
+
+def line_coords(x0, y0, x1, y1):
+    """Returns the (ys, xs) pixel coordinates of a line."""
+    size = max(abs(x1 - x0), abs(y1 - y0)) + 1
+    ys = np.empty(size, dtype=np.int64)
+    xs = np.empty(size, dtype=np.int64)
+    n = _line_into(ys, xs, 0, x0, y0, x1, y1)
+    return ys[:n], xs[:n]
+
+
+def draw_line(array, x0, y0, x1, y1, color):
+    """Draws a line on the numpy array with the specified color."""
+    ys, xs = line_coords(x0, y0, x1, y1)
+    array[ys, xs] = color
+
+
+def arc_coords(x, y, radius, theta0, theta1):
+    """Returns the (ys, xs) pixel coordinates of an arc."""
+    num_steps = int(round(2*radius))
+    # each step is a chord of at most 2*pi*radius/num_steps pixels, plus truncation
+    size = int(2*pi*radius) + 3*num_steps + 1
+    ys = np.empty(size, dtype=np.int64)
+    xs = np.empty(size, dtype=np.int64)
+    n = _arc_into(ys, xs, 0, x, y, radius, theta0, theta1, num_steps)
+    return ys[:n], xs[:n]
+
+
+def draw_arc(array, x, y, radius, theta0, theta1, color):
+    """Draws an arc on the numpy array with the specified color."""
+    ys, xs = arc_coords(x, y, radius, theta0, theta1)
+    array[ys, xs] = color
 
 meshgrids = {}
 def circle(x, y, radius, shape):
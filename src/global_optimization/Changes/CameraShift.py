@@ -2,6 +2,7 @@ from .Change import Change, useDistanceObjective
 from .utils import objective, dist_objective, generate_synthetic_image
 import numpy as np
 from copy import deepcopy
+from global_optimization.Modules import CellNodeM
 
 
 class CameraShift(Change):
@@ -12,7 +13,9 @@ class CameraShift(Change):
         self.old_cellmap = cellmap
         self.simulation_config = frame.simulation_config
         self.config = config
-        self.new_node_map = deepcopy(frame.node_map)
+        # only the cells move; copy them into unlinked nodes instead of deep copying
+        # the whole lineage reachable through parent/children
+        self.new_node_map = {name: CellNodeM(deepcopy(node.cell)) for name, node in frame.node_map.items()}
 
         camera_shift_x_sigma = config["camera"]["modification.x.sigma"]
         camera_shift_y_sigma = config["camera"]["modification.y.sigma"]
@@ -48,4 +51,5 @@ class CameraShift(Change):
     def apply(self):
         self.old_synthimage[:] = self.new_synthimage
         self.old_cellmap[:] = self.new_cellmap
-        self.frame.node_map = self.new_node_map
+        for name, node in self.new_node_map.items():
+            self.frame.node_map[name].cell = node.cell
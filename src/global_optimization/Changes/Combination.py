@@ -1,5 +1,5 @@
-from .Change import Change, useDistanceObjective
-from .utils import is_cell, is_background, objective, dist_objective, check_constraints
+from .Change import Change
+from .utils import is_cell, is_background, check_constraints, redraw_window, region_cost
 from global_optimization.Modules import CellNodeM, FrameM
 
 
@@ -39,39 +39,23 @@ class Combination(Change):
 
     @property
     def costdiff(self) -> float:
-        overlap_cost = self.config["overlap.cost"]
-        new_synth = self.synthimage.copy()
-        new_cellmap = self.cellmap.copy()
         region = self.combination.simulated_region(self.frame.simulation_config)
 
         for child in self.node.children:
             region = region.union(child.cell.simulated_region(self.frame.simulation_config))
 
+        # draw the proposal in place, then restore only the pixels it touched
+        window = redraw_window(region)
+        old_synth = self.synthimage[window].copy()
+        old_cellmap = self.cellmap[window].copy()
+        start_cost = region_cost(self.config, self.realimage, self.synthimage, self.cellmap, self.distmap, region)
         for child in self.node.children:
-            child.cell.draw(new_synth, new_cellmap, is_background, self.frame.simulation_config)
-
-        self.combination.draw(new_synth, new_cellmap, is_cell, self.frame.simulation_config)
-
-        if useDistanceObjective:
-            start_cost = dist_objective(self.realimage[region.top:region.bottom, region.left:region.right],
-                                        self.synthimage[region.top:region.bottom, region.left:region.right],
-                                        self.distmap[region.top:region.bottom, region.left:region.right],
-                                        self.cellmap[region.top:region.bottom, region.left:region.right],
-                                        overlap_cost)
-            end_cost = dist_objective(self.realimage[region.top:region.bottom, region.left:region.right],
-                                      new_synth[region.top:region.bottom, region.left:region.right],
-                                      self.distmap[region.top:region.bottom, region.left:region.right],
-                                      new_cellmap[region.top:region.bottom, region.left:region.right],
-                                      overlap_cost)
-        else:
-            start_cost = objective(self.realimage[region.top:region.bottom, region.left:region.right],
-                                   self.synthimage[region.top:region.bottom, region.left:region.right],
-                                   self.cellmap[region.top:region.bottom, region.left:region.right],
-                                   overlap_cost, self.config["cell.importance"])
-            end_cost = objective(self.realimage[region.top:region.bottom, region.left:region.right],
-                                 new_synth[region.top:region.bottom, region.left:region.right],
-                                 new_cellmap[region.top:region.bottom, region.left:region.right],
-                                 overlap_cost, self.config["cell.importance"])
+            child.cell.draw(self.synthimage, self.cellmap, is_background, self.frame.simulation_config)
+
+        self.combination.draw(self.synthimage, self.cellmap, is_cell, self.frame.simulation_config)
+        end_cost = region_cost(self.config, self.realimage, self.synthimage, self.cellmap, self.distmap, region)
+        self.synthimage[window] = old_synth
+        self.cellmap[window] = old_cellmap
 
         return end_cost - start_cost + self.config["combine.cost"]
 
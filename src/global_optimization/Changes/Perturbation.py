@@ -1,5 +1,5 @@
-from .Change import Change, useDistanceObjective
-from .utils import is_cell, is_background, objective, dist_objective, check_constraints
+from .Change import Change
+from .utils import is_cell, is_background, check_constraints, redraw_window, region_cost
 import numpy as np
 from copy import deepcopy
 from typing import Any, Dict, List, Tuple
@@ -91,34 +91,18 @@ class Perturbation(Change):
 
     @property
     def costdiff(self):
-        overlap_cost = self.config["overlap.cost"]
-        new_synth = self.synthimage.copy()
-        new_cellmap = self.cellmap.copy()
         region = self.node.cell.simulated_region(self.frame.simulation_config).\
             union(self.replacement_cell.simulated_region(self.frame.simulation_config))
-        self.node.cell.draw(new_synth, new_cellmap, is_background, self.frame.simulation_config)
-        self.replacement_cell.draw(new_synth, new_cellmap, is_cell, self.frame.simulation_config)
-
-        if useDistanceObjective:
-            start_cost = dist_objective(self.realimage[region.top:region.bottom, region.left:region.right],
-                                        self.synthimage[region.top:region.bottom, region.left:region.right],
-                                        self.distmap[region.top:region.bottom, region.left:region.right],
-                                        self.cellmap[region.top:region.bottom, region.left:region.right],
-                                        overlap_cost)
-            end_cost = dist_objective(self.realimage[region.top:region.bottom, region.left:region.right],
-                                      new_synth[region.top:region.bottom, region.left:region.right],
-                                      self.distmap[region.top:region.bottom, region.left:region.right],
-                                      new_cellmap[region.top:region.bottom, region.left:region.right],
-                                      overlap_cost)
-        else:
-            start_cost = objective(self.realimage[region.top:region.bottom, region.left:region.right],
-                                   self.synthimage[region.top:region.bottom, region.left:region.right],
-                                   self.cellmap[region.top:region.bottom, region.left:region.right],
-                                   overlap_cost, self.config["cell.importance"])
-            end_cost = objective(self.realimage[region.top:region.bottom, region.left:region.right],
-                                 new_synth[region.top:region.bottom, region.left:region.right],
-                                 new_cellmap[region.top:region.bottom, region.left:region.right],
-                                 overlap_cost, self.config["cell.importance"])
+        # draw the proposal in place, then restore only the pixels it touched
+        window = redraw_window(region)
+        old_synth = self.synthimage[window].copy()
+        old_cellmap = self.cellmap[window].copy()
+        start_cost = region_cost(self.config, self.realimage, self.synthimage, self.cellmap, self.distmap, region)
+        self.node.cell.draw(self.synthimage, self.cellmap, is_background, self.frame.simulation_config)
+        self.replacement_cell.draw(self.synthimage, self.cellmap, is_cell, self.frame.simulation_config)
+        end_cost = region_cost(self.config, self.realimage, self.synthimage, self.cellmap, self.distmap, region)
+        self.synthimage[window] = old_synth
+        self.cellmap[window] = old_cellmap
 
         return end_cost - start_cost
 
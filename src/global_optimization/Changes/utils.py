@@ -2,6 +2,9 @@ import numpy as np
 from math import sqrt
 from typing import List, Tuple
 
+from objective_funcs import objective, dist_objective
+from .Change import useDistanceObjective
+
 # Code taken from optimization.py
 # -->
 
@@ -9,29 +12,17 @@ is_cell = True
 is_background = False
 
 
-def objective(realimage, synthimage, cellmap, overlap_cost, cell_importance):
-    """Full objective function between two images."""
-    overlap_map = cellmap[cellmap > 1] - 1
-    return np.sum(np.square((realimage - synthimage))) \
-        + overlap_cost * np.sum(np.square(overlap_map))
-
-
-def dist_objective(realimage, synthimage, distmap, cellmap, overlap_cost):
-    overlap_map = cellmap[cellmap > 1] - 1
-    return np.sum(np.square((realimage - synthimage) * distmap)) + overlap_cost * np.sum(np.square(overlap_map))
-
-
 def generate_synthetic_image(cellnodes, shape, simulation_config):
     image_type = simulation_config["image.type"]
     cellmap = np.zeros(shape, dtype=int)
     if image_type == "graySynthetic" or image_type == "phaseContrast":
         background_color = simulation_config["background.color"]
-        synthimage = np.full(shape, background_color)
+        synthimage = np.full(shape, background_color, dtype=np.float32)
         for node in cellnodes:
             node.cell.draw(synthimage, cellmap, is_cell, simulation_config)
         return synthimage, cellmap
     else:
-        synthimage = np.zeros(shape)
+        synthimage = np.zeros(shape, dtype=np.float32)
         for node in cellnodes:
             node.cell.draw(synthimage, cellmap, is_cell, simulation_config)
         return synthimage, cellmap
@@ -39,6 +30,21 @@ def generate_synthetic_image(cellnodes, shape, simulation_config):
 # <--
 
 
+def region_cost(config, realimage, synthimage, cellmap, distmap, region):
+    """Objective restricted to a region of the frame."""
+    window = (slice(region.top, region.bottom), slice(region.left, region.right))
+    if useDistanceObjective:
+        return dist_objective(realimage[window], synthimage[window], distmap[window], cellmap[window], config["overlap.cost"])
+    return objective(realimage[window], synthimage[window], cellmap[window], config["overlap.cost"], config["cell.importance"])
+
+
+def redraw_window(region):
+    """Slices covering every pixel that redrawing cells within a simulated region can write."""
+    # Bacilli.draw rounds the diffraction extension up, simulated_region rounds it down
+    return (slice(max(region.top - 1, 0), max(region.bottom + 1, 0)),
+            slice(max(region.left - 1, 0), max(region.right + 1, 0)))
+
+
 def check_constraints(config, imageshape, cells: List['Cell.Bacilli'], pairs: List[Tuple['cell.Bacilli', 'cell.Bacilli']] = None):
     max_displacement = config['bacilli.maxSpeed'] / config['global.framesPerSecond']
     max_rotation = config['bacilli.maxSpin'] / config['global.framesPerSecond']
@@ -1,3 +1,5 @@
+from collections import deque
+from .CellNodeM import CellNodeM
 from .FrameM import FrameM
 import numpy as np
 
@@ -9,6 +11,71 @@ class LineageM:
     def __repr__(self):
         return '\n'.join([str(frame) for frame in self.frames])
 
+    def __getstate__(self):
+        # frames link back through prev and nodes link through parent/children,
+        # which pickle and deepcopy would follow one recursive call per link;
+        # flatten the graph into index columns instead
+        frames = []
+        frame_index = {}
+        for frame in self.frames:
+            while frame is not None and id(frame) not in frame_index:
+                frame_index[id(frame)] = len(frames)
+                frames.append(frame)
+                frame = frame.prev
+
+        nodes = []
+        node_index = {}
+        queue = deque(node for frame in frames for node in frame.node_map.values())
+        while queue:
+            node = queue.popleft()
+            if id(node) in node_index:
+                continue
+            node_index[id(node)] = len(nodes)
+            nodes.append(node)
+            if node.parent is not None:
+                queue.append(node.parent)
+            queue.extend(node.children)
+
+        return {
+            'frames': np.array([frame_index[id(frame)] for frame in self.frames], dtype=np.int32),
+            'prev': np.array([-1 if frame.prev is None else frame_index[id(frame.prev)] for frame in frames], dtype=np.int32),
+            'simulation_configs': [frame.simulation_config for frame in frames],
+            'map_offsets': np.cumsum([0] + [len(frame.node_map) for frame in frames], dtype=np.int32),
+            'map_names': [name for frame in frames for name in frame.node_map],
+            'map_nodes': np.array([node_index[id(node)] for frame in frames for node in frame.node_map.values()], dtype=np.int32),
+            'cells': [node.cell for node in nodes],
+            'parent': np.array([-1 if node.parent is None else node_index[id(node.parent)] for node in nodes], dtype=np.int32),
+            'child_offsets': np.cumsum([0] + [len(node.children) for node in nodes], dtype=np.int32),
+            'children': np.array([node_index[id(child)] for node in nodes for child in node.children], dtype=np.int32),
+        }
+
+    def __setstate__(self, state):
+        nodes = []
+        for cell in state['cells']:
+            node = CellNodeM.__new__(CellNodeM)
+            node.cell = cell
+            nodes.append(node)
+        parent = state['parent'].tolist()
+        children = state['children'].tolist()
+        child_offsets = state['child_offsets'].tolist()
+        for i, node in enumerate(nodes):
+            node.parent = None if parent[i] < 0 else nodes[parent[i]]
+            node.children = [nodes[j] for j in children[child_offsets[i]:child_offsets[i + 1]]]
+
+        frames = []
+        map_names = state['map_names']
+        map_nodes = state['map_nodes'].tolist()
+        map_offsets = state['map_offsets'].tolist()
+        for i, simulation_config in enumerate(state['simulation_configs']):
+            frame = FrameM.__new__(FrameM)
+            frame.simulation_config = simulation_config
+            frame.node_map = {map_names[j]: nodes[map_nodes[j]] for j in range(map_offsets[i], map_offsets[i + 1])}
+            frames.append(frame)
+        for frame, prev in zip(frames, state['prev'].tolist()):
+            frame.prev = None if prev < 0 else frames[prev]
+
+        self.frames = [frames[i] for i in state['frames'].tolist()]
+
     @property
     def total_cell_count(self):
         return sum(len(frame.node_map) for frame in self.frames)
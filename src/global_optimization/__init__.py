@@ -1,2 +1,3 @@
 from .global_optimize import global_optimize, totalCostDiff
 from .auto_temp_schedule import auto_temp_schedule
+from .utils import SharedImages
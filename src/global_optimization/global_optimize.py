@@ -18,10 +18,11 @@ def global_optimize(imagefiles, lineage, realimages, synthimages, cellmaps, dist
     batch_size = total_iterations // args.batches
 
     if in_auto_temp_schedule:
+        # the trial run never looks past window_end, so only copy the frames up to it
         lineage = deepcopy(lineage)
-        synthimages = deepcopy(synthimages)
-        distmaps = deepcopy(distmaps)
-        cellmaps = deepcopy(cellmaps)
+        synthimages = deepcopy(synthimages[:window_end])
+        distmaps = deepcopy(distmaps[:window_end])
+        cellmaps = deepcopy(cellmaps[:window_end])
 
         return optimize_core(lineage, realimages, synthimages, cellmaps, distmaps, window_start, window_end, args.start_temp, args.end_temp, config, iteration_per_cell, 0, total_iterations, total_iterations, in_auto_temp_schedule, const_temp)
 
@@ -48,10 +49,12 @@ def global_optimize(imagefiles, lineage, realimages, synthimages, cellmaps, dist
     while current_iteration < total_iterations:
         print(current_iteration, total_iterations)
         futures = []
+        # give every chain its own seed so the ensemble explores independently
+        seeds = np.random.randint(0, 2**32, size=args.jobs, dtype=np.int64)
         for i in range(args.jobs):
             # DO NOT USE client.scatter()
             # TODO: suppress warnings that advise scatter
-            futures.append(client.submit(optimize_core, temp_lineage, temp_realimages, temp_synthimages, temp_cellmaps, temp_distmaps, window_start, window_end, args.start_temp, args.end_temp, config, iteration_per_cell, current_iteration, batch_size, total_iterations, in_auto_temp_schedule, const_temp, offset=True))
+            futures.append(client.submit(optimize_core, temp_lineage, temp_realimages, temp_synthimages, temp_cellmaps, temp_distmaps, window_start, window_end, args.start_temp, args.end_temp, config, iteration_per_cell, current_iteration, batch_size, total_iterations, in_auto_temp_schedule, const_temp, offset=True, seed=seeds[i], pure=False))
 
         try:
             # sometimes this doesn't catch the errors
@@ -91,7 +94,10 @@ def global_optimize(imagefiles, lineage, realimages, synthimages, cellmaps, dist
 
 
 def optimize_core(lineage, realimages, synthimages, cellmaps, distmaps, window_start, window_end, start_temp, end_temp, config,
-                  iteration_per_cell, current_iteration, batch_size, total_iterations, in_auto_temp_schedule, const_temp, offset=False):
+                  iteration_per_cell, current_iteration, batch_size, total_iterations, in_auto_temp_schedule, const_temp, offset=False, seed=None):
+
+    if seed is not None:
+        np.random.seed(seed)
 
     if in_auto_temp_schedule:
         pbad_total = 0
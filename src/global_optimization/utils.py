@@ -1,3 +1,78 @@
+import numpy as np
+
+try:
+    from multiprocessing.shared_memory import SharedMemory
+except ImportError:
+    # Python < 3.8; frames are then shipped to workers by value
+    SharedMemory = None
+
+
 def gerp(a, b, t):
     """Geometric interpolation"""
     return a * (b / a) ** t
+
+
+# shared memory blocks this process has attached to, kept open for its lifetime
+_attached = {}
+
+
+class SharedImages:
+    """A stack of equally sized frames held in shared memory.
+
+    Slices are windows onto the same block, and pickling sends only the block
+    name and window, so workers on this machine read the frames in place.
+    """
+
+    available = SharedMemory is not None
+
+    def __init__(self, images):
+        images = np.asarray(images)
+        shm = SharedMemory(create=True, size=max(images.nbytes, 1))
+        self._state = (shm.name, images.shape, images.dtype.str, 0, len(images))
+        self._shm = _attached[shm.name] = shm
+        self._frames = np.ndarray(images.shape, images.dtype, buffer=shm.buf)
+        self._frames[:] = images
+
+    def __getstate__(self):
+        return self._state
+
+    def __setstate__(self, state):
+        name, shape, dtype, start, end = state
+        shm = _attached.get(name)
+        if shm is None:
+            shm = _attached[name] = SharedMemory(name=name)
+        self._state = state
+        self._shm = shm
+        self._frames = np.ndarray(shape, dtype, buffer=shm.buf)[start:end]
+
+    def __len__(self):
+        return len(self._frames)
+
+    def __iter__(self):
+        return iter(self._frames)
+
+    def __array__(self, dtype=None, copy=None):
+        frames = self._frames
+        if dtype is not None and frames.dtype != dtype:
+            if copy is False:
+                raise ValueError('converting the shared frames to another dtype requires a copy')
+            return frames.astype(dtype)
+        return frames.copy() if copy else frames
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self._frames[key]
+        name, shape, dtype, start, end = self._state
+        window = range(start, end)[key]
+        if window.step != 1:
+            raise ValueError('SharedImages only supports contiguous slices')
+        images = SharedImages.__new__(SharedImages)
+        images.__setstate__((name, shape, dtype, window.start, window.stop))
+        return images
+
+    def __setitem__(self, key, value):
+        self._frames[key] = np.asarray(value)
+
+    def unlink(self):
+        """Remove the block once every process is done with it."""
+        self._shm.unlink()
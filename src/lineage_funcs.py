@@ -1,4 +1,4 @@
-from cell import Bacilli
+from cell import BACILLI, Bacilli
 import optimization
 from typing import List
 from global_optimization.Modules import CellNodeM, LineageM
@@ -29,14 +29,14 @@ def build_initial_lineage(imagefiles, realimages, lineagefile, continue_from, si
 
 def load_colony(colony, initial_file, config, initial_frame=None):
     """Loads the initial colony of cells."""
+    celltype = config['_celltype_tag']
     with open(initial_file, newline='') as fp:
         reader = csv.DictReader(fp, skipinitialspace=True)
         for row in reader:
             if initial_frame is not None and row['file'] != initial_frame:
                 continue
             name = row['name']
-            celltype = config['global.cellType'].lower()
-            if celltype == 'bacilli':
+            if celltype == BACILLI:
                 x = float(row['x'])
                 y = float(row['y'])
                 width = float(row['width'])
@@ -62,15 +62,15 @@ def create_lineage(imagefiles, realimages, config, args):
     return lineage
 
 
-def save_lineage(filename, cellnodes: List[CellNodeM], lineagefile):
-    for node in cellnodes:
-        properties = [filename, node.cell.name]
-        properties.extend([
-            str(node.cell.x),
-            str(node.cell.y),
-            str(node.cell.width),
-            str(node.cell.length),
-            str(node.cell.rotation),
-            str(node.cell.split_alpha),
-            str(node.cell.opacity)])
-        print(','.join(properties), file=lineagefile)
+def save_lineage(filename, cellnodes: List[CellNodeM], lineagewriter):
+    # str() keeps a missing split_alpha as 'None'; csv.writer would write an empty field
+    lineagewriter.writerows([
+        filename,
+        node.cell.name,
+        str(node.cell.x),
+        str(node.cell.y),
+        str(node.cell.width),
+        str(node.cell.length),
+        str(node.cell.rotation),
+        str(node.cell.split_alpha),
+        str(node.cell.opacity)] for node in cellnodes)
@@ -9,21 +9,17 @@ The entry point for CellAnneal program.
 """
 import argparse
 import multiprocessing
-from copy import deepcopy
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import optimization
-from global_optimization import global_optimize, auto_temp_schedule
-from scipy.ndimage import distance_transform_edt
+from global_optimization import global_optimize, auto_temp_schedule, SharedImages
 import numpy as np
 from matplotlib import cm
 from matplotlib.colors import Normalize
 from PIL import Image
 from lineage_funcs import create_lineage, save_lineage
 
-import sys
-sys.setrecursionlimit(10000)
-# bootleg fix to prevent recursion error when pickling large lineages
-
 
 def parse_args():
     """Reads and parses the command-line arguments."""
@@ -48,6 +44,8 @@ def parse_args():
                         help='one of "best-wins", "worst-wins", "extreme-wins"')
     parser.add_argument('--cluster', type=str, default='',
                         help='dask cluster address (defaults to local cluster)')
+    parser.add_argument('--gpu', action='store_true', default=False,
+                        help='compute distance maps on the GPU (requires cupy and cucim)')
     parser.add_argument('--no_parallel', action='store_true', default=False, help='disable parallelism')
     parser.add_argument('--global_optimization', action='store_true', default=False, help='global optimization')
     parser.add_argument('--binary', action='store_true', default=True,
@@ -112,10 +110,12 @@ def load_config(config_file):
     elif 'global.framesPerSecond' not in config:
         raise ValueError('Invalid config: missing "global.framesPerSecond"')
 
-    if config['global.cellType'].lower() == 'bacilli':
-        celltype = Bacilli
-    else:
+    if config['global.cellType'].lower() not in CELL_TYPES:
         raise ValueError('Invalid config: unsupported cell type')
+    config['_celltype_tag'] = CELL_TYPES[config['global.cellType'].lower()]
+
+    if config['_celltype_tag'] == BACILLI:
+        celltype = Bacilli
 
     celltype.checkconfig(config)
 
@@ -131,10 +131,20 @@ def get_inputfiles(args):
     elif args.frame_first < 0:
         raise ValueError('Invalid interval: frame_first must be greater or equal to 0')
 
+    # list each input directory once instead of stat-ing every file
+    present = {}
+    # the pattern takes the frame number only, so bind its formatter once
+    input_path = args.input.__mod__
     for i in count(args.frame_first):
         # check to see if the file exists
-        file = Path(args.input % i)
-        if file.exists() and file.is_file():
+        file = Path(input_path(i))
+        if file.parent not in present:
+            try:
+                with os.scandir(file.parent) as entries:
+                    present[file.parent] = {entry.name for entry in entries if entry.is_file()}
+            except OSError:
+                present[file.parent] = set()
+        if file.name in present[file.parent]:
             inputfiles.append(file)
             if i == args.frame_last:
                 break
@@ -145,28 +155,39 @@ def get_inputfiles(args):
     return inputfiles
 
 
+# residual colormaps keyed on (vmin, vmax), built once rather than per frame
+_colormaps = {}
+# uint8 scratch buffers keyed on frame shape, reused for every bestfit frame
+_bestfit_buffers = {}
+
+
 def save_output(image_name, synthimage, realimage, cellnodes, args, config):
     residual_vmin = config["residual.vmin"]
     residual_vmax = config["residual.vmax"]
     if args.residual:
-        colormap = cm.ScalarMappable(norm=Normalize(vmin=residual_vmin, vmax=residual_vmax), cmap="bwr")
-    bestfit_frame = Image.fromarray(np.uint8(255 * synthimage), "L")
+        colormap = _colormaps.get((residual_vmin, residual_vmax))
+        if colormap is None:
+            colormap = cm.ScalarMappable(norm=Normalize(vmin=residual_vmin, vmax=residual_vmax), cmap="bwr")
+            _colormaps[residual_vmin, residual_vmax] = colormap
+    bestfit = _bestfit_buffers.get(synthimage.shape)
+    if bestfit is None:
+        bestfit = _bestfit_buffers[synthimage.shape] = np.empty(synthimage.shape, dtype=np.uint8)
+    # same truncating cast as np.uint8(255 * synthimage), without the temporaries
+    np.multiply(synthimage, 255, out=bestfit, casting='unsafe')
+    bestfit_frame = Image.frombuffer("L", bestfit.shape[::-1], bestfit, "raw", "L", 0, 1)
     bestfit_frame.save(args.bestfit / image_name)
-    shape = realimage.shape
-    output_frame = np.empty((shape[0], shape[1], 3))
-    output_frame[..., 0] = realimage
-    output_frame[..., 1] = output_frame[..., 0]
-    output_frame[..., 2] = output_frame[..., 0]
-    for node in cellnodes:
-        if node.cell.dormant:
-            continue
-        node.cell.drawoutline(output_frame, (1, 0, 0))
-    output_frame = Image.fromarray(np.uint8(255 * output_frame))
+    output_frame = np.repeat(np.uint8(255 * realimage)[..., None], 3, axis=2)
+    outlines = [node.cell.outline_coords() for node in cellnodes if not node.cell.dormant]
+    if outlines:
+        ys = np.concatenate([outline[0] for outline in outlines])
+        xs = np.concatenate([outline[1] for outline in outlines])
+        output_frame[ys, xs] = (255, 0, 0)
+    output_frame = Image.fromarray(output_frame)
     output_frame.save(args.output / image_name)
 
     if args.residual:
-        residual_frame = Image.fromarray(np.uint8(255 * colormap.to_rgba(np.clip(realimage - synthimage,
-                                                                                 residual_vmin, residual_vmax))), "RGB")
+        residual = colormap.to_rgba(np.clip(realimage - synthimage, residual_vmin, residual_vmax), bytes=True)
+        residual_frame = Image.fromarray(residual, "RGBA").convert("RGB")
         residual_frame.save(args.residual / image_name)
 
 
@@ -179,8 +200,9 @@ def main(args):
         import dask
         from dask.distributed import Client, LocalCluster
         if not args.cluster:
+            # one worker process per core already; keep numba's kernels single threaded inside them
             cluster = LocalCluster(
-                n_workers=args.workers, threads_per_worker=1,
+                n_workers=args.workers, threads_per_worker=1, env={'NUMBA_NUM_THREADS': '1'},
             )
             client = Client(cluster)
         else:
@@ -191,6 +213,7 @@ def main(args):
         client = None
 
     lineagefile = None
+    sharedimages = None
     start = time.time()
 
     try:
@@ -219,24 +242,23 @@ def main(args):
         np.random.seed(seed)
         print("Seed: {}".format(seed))
 
-        celltype = config['global.cellType'].lower()
+        celltype = config['_celltype_tag']
 
         imagefiles = get_inputfiles(args)
 
         # open the lineage file for writing
-        lineagefile = open(args.output / 'lineage.csv', 'w')
+        lineagefile = open(args.output / 'lineage.csv', 'w', buffering=1 << 20, newline='')
+        lineagewriter = csv.writer(lineagefile, lineterminator='\n')
         header = ['file', 'name']
-        if celltype == 'bacilli':
+        if celltype == BACILLI:
             header.extend(['x', 'y', 'width', 'length', 'rotation', "split_alpha", "opacity"])
-        print(','.join(header), file=lineagefile)
+        lineagewriter.writerow(header)
 
         if args.debug:
             with open(args.debug / 'debug.csv', 'w') as debugfile:
                 print(','.join(['window_start', 'window_end', 'pbad_total', 'bad_count', 'temperature', 'total_cost_diff', 'current_iteration', 'total_iterations']), file=debugfile)
 
         if args.global_optimization:
-            sa_config = deepcopy(config)
-
             # List of simulated annealing keys to modify
             keys_to_modify = [
                 "modification.x.mu",
@@ -251,14 +273,17 @@ def main(args):
                 "modification.rotation.sigma"
             ]
 
-            for key, value in sa_config["perturbation"].items():
-                if key in keys_to_modify:
-                    sa_config["perturbation"][key] = value / sa_config["iteration_per_cell"]
+            # only the perturbation settings are rescaled, so the rest of the config is shared
+            sa_config = dict(config)
+            sa_config["perturbation"] = {
+                key: value / config["iteration_per_cell"] if key in keys_to_modify else value
+                for key, value in config["perturbation"].items()}
 
             global useDistanceObjective
 
             useDistanceObjective = args.dist
-            realimages = [optimization.load_image(imagefile) for imagefile in imagefiles]
+            with ThreadPoolExecutor(max_workers=args.workers) as executor:
+                realimages = list(executor.map(optimization.load_image, imagefiles))
 
             # setup the colony from a file with the initial properties
             lineage = create_lineage(imagefiles, realimages, sa_config, args)
@@ -267,6 +292,7 @@ def main(args):
             sim_start = args.continue_from - args.frame_first
             print(sim_start)
             shape = realimages[0].shape
+            pad = 0
             if 'padding' in sa_config["simulation"]:
                 pad = sa_config["simulation"]["padding"]
                 shape = (shape[0] + 2 * pad, shape[1] + 2 * pad)
@@ -274,8 +300,16 @@ def main(args):
                     for cellnode in lineage.frames[i].node_map.values():
                         cellnode.cell.x = cellnode.cell.x + pad
                         cellnode.cell.y = cellnode.cell.y + pad
-            synthimages = []
-            cellmaps = []
+            if pad > 0:
+                # pad every frame once; the border is filled per frame below
+                padded = np.empty((len(realimages),) + shape, dtype=realimages[0].dtype)
+                padded[:, pad:-pad, pad:-pad] = realimages
+                realimages = list(padded)
+            if client is not None and not args.cluster and SharedImages.available:
+                # local workers read the frames from shared memory instead of unpickling copies
+                realimages = sharedimages = SharedImages(realimages)
+            synthimages = np.empty((len(realimages),) + shape, dtype=np.float32)
+            cellmaps = np.empty((len(realimages),) + shape, dtype=np.int32)
             distmaps = []
             iteration_per_cell = sa_config["iteration_per_cell"]
             if not useDistanceObjective:
@@ -288,17 +322,18 @@ def main(args):
                     if window_start >= sim_start:
                         if window_end > 1:
                             lineage.copy_forward()
-                    if pad > 0:
-                        realimages[window_end - 1] = np.pad(realimages[window_end - 1], [(pad, pad), (pad, pad)], mode='constant', constant_values=lineage.frames[window_end - 1].simulation_config['background.color'])
                     realimage = realimages[window_end - 1]
-                    synthimage, cellmap = optimization.generate_synthetic_image(lineage.frames[window_end - 1].nodes, shape, lineage.frames[window_end - 1].simulation_config)
-                    synthimages.append(synthimage)
-                    cellmaps.append(cellmap)
+                    if pad > 0:
+                        background_color = lineage.frames[window_end - 1].simulation_config['background.color']
+                        realimage[:pad] = background_color
+                        realimage[-pad:] = background_color
+                        realimage[:, :pad] = background_color
+                        realimage[:, -pad:] = background_color
+                    synthimages[window_end - 1], cellmaps[window_end - 1] = optimization.generate_synthetic_image(lineage.frames[window_end - 1].nodes, shape, lineage.frames[window_end - 1].simulation_config)
+                    synthimage = synthimages[window_end - 1]
+                    cellmap = cellmaps[window_end - 1]
                     if useDistanceObjective:
-                        distmap = distance_transform_edt(realimage < .5)
-                        distmap /= sa_config[f'{sa_config["global.cellType"].lower()}.distanceCostDivisor'] * sa_config[
-                            'global.pixelsPerMicron']
-                        distmap += 1
+                        distmap = optimization.distance_map(realimage, sa_config, args.gpu)
                         distmaps.append(distmap)
                     if args.auto_temp == 1 and window_end == 1:
                         print("auto temperature schedule started")
@@ -319,18 +354,20 @@ def main(args):
                         global_optimize.totalCostDiff = optimization.objective(realimage, synthimage, cellmap, sa_config["overlap.cost"], sa_config["cell.importance"])
                     lineage, synthimages, distmaps, cellmaps = global_optimize(imagefiles, lineage, realimages, synthimages, cellmaps, distmaps, window_start, window_end, lineagefile, args, sa_config, iteration_per_cell, client=client)
                 if window_start >= 0:
-                    save_lineage(imagefiles[window_start].name, lineage.frames[window_start].nodes, lineagefile)
+                    save_lineage(imagefiles[window_start].name, lineage.frames[window_start].nodes, lineagewriter)
                     save_output(imagefiles[window_start].name, synthimages[window_start], realimages[window_start], lineage.frames[window_start].nodes, args, sa_config)
             return 0
 
         # local optimization
-        optimization.local_optimize(imagefiles, config, args, lineagefile, client)
+        optimization.local_optimize(imagefiles, config, args, lineagewriter, client)
 
     except KeyboardInterrupt as error:
         raise error
     finally:
         if lineagefile:
             lineagefile.close()
+        if sharedimages is not None:
+            sharedimages.unlink()
 
     print(f'{time.time() - start} seconds')
     if client and not cluster:
@@ -347,7 +384,7 @@ if __name__ == '__main__':
     from itertools import count
 
     import jsonc
-    from cell import Bacilli
+    from cell import BACILLI, CELL_TYPES, Bacilli
     from sys import exit
     # pr = cProfile.Profile()
     # pr.enable()
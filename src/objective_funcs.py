@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+"""
+cellanneal.objective_funcs
+~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+Objective functions comparing real and synthetic images.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+
+# images at least this large are reduced on all cores; cell regions are not
+PARALLEL_MIN_PIXELS = 1 << 16
+
+# side of the square blocks full images are reduced in, sized so that one
+# block of every input fits in L2 cache
+TILE_SIZE = 256
+
+
+def _objective_sum(realimage, synthimage, cellmap, overlap_cost):
+    """Fused single-pass objective, compiled with numba."""
+    diff_total = 0.0
+    overlap_total = 0.0
+    for i in prange(realimage.shape[0]):
+        for j in range(realimage.shape[1]):
+            diff = realimage[i, j] - synthimage[i, j]
+            diff_total += diff * diff
+            overlap = cellmap[i, j] - 1
+            if overlap > 0:
+                overlap_total += overlap * overlap
+    return diff_total + overlap_cost * overlap_total
+
+
+def _dist_objective_sum(realimage, synthimage, distmap, cellmap, overlap_cost):
+    """Fused single-pass distance-based objective, compiled with numba."""
+    diff_total = 0.0
+    overlap_total = 0.0
+    for i in prange(realimage.shape[0]):
+        for j in range(realimage.shape[1]):
+            diff = (realimage[i, j] - synthimage[i, j]) * distmap[i, j]
+            diff_total += diff * diff
+            overlap = cellmap[i, j] - 1
+            if overlap > 0:
+                overlap_total += overlap * overlap
+    return diff_total + overlap_cost * overlap_total
+
+
+def _objective_tiles(realimage, synthimage, cellmap, overlap_cost):
+    """Objective reduced per tile on all cores, then across tiles in a fixed order."""
+    rows = (realimage.shape[0] + TILE_SIZE - 1) // TILE_SIZE
+    cols = (realimage.shape[1] + TILE_SIZE - 1) // TILE_SIZE
+    partial = np.zeros(rows * cols)
+    for t in prange(rows * cols):
+        top = (t // cols) * TILE_SIZE
+        left = (t % cols) * TILE_SIZE
+        partial[t] = _objective_serial(realimage[top:top + TILE_SIZE, left:left + TILE_SIZE],
+                                       synthimage[top:top + TILE_SIZE, left:left + TILE_SIZE],
+                                       cellmap[top:top + TILE_SIZE, left:left + TILE_SIZE],
+                                       overlap_cost)
+    return partial.sum()
+
+
+def _dist_objective_tiles(realimage, synthimage, distmap, cellmap, overlap_cost):
+    """Distance-based objective reduced per tile on all cores, then across tiles in a fixed order."""
+    rows = (realimage.shape[0] + TILE_SIZE - 1) // TILE_SIZE
+    cols = (realimage.shape[1] + TILE_SIZE - 1) // TILE_SIZE
+    partial = np.zeros(rows * cols)
+    for t in prange(rows * cols):
+        top = (t // cols) * TILE_SIZE
+        left = (t % cols) * TILE_SIZE
+        partial[t] = _dist_objective_serial(realimage[top:top + TILE_SIZE, left:left + TILE_SIZE],
+                                            synthimage[top:top + TILE_SIZE, left:left + TILE_SIZE],
+                                            distmap[top:top + TILE_SIZE, left:left + TILE_SIZE],
+                                            cellmap[top:top + TILE_SIZE, left:left + TILE_SIZE],
+                                            overlap_cost)
+    return partial.sum()
+
+
+if njit is not None:
+    _objective_serial = njit(fastmath=True, cache=True)(_objective_sum)
+    _objective_parallel = njit(parallel=True, fastmath=True, cache=True)(_objective_tiles)
+    _dist_objective_serial = njit(fastmath=True, cache=True)(_dist_objective_sum)
+    _dist_objective_parallel = njit(parallel=True, fastmath=True, cache=True)(_dist_objective_tiles)
+
+
+def objective(realimage, synthimage, cellmap, overlap_cost, cell_importance):
+    """Full objective function between two images."""
+    if njit is not None:
+        if realimage.size >= PARALLEL_MIN_PIXELS:
+            return _objective_parallel(realimage, synthimage, cellmap, overlap_cost)
+        return _objective_serial(realimage, synthimage, cellmap, overlap_cost)
+    overlap_map = cellmap[cellmap > 1] - 1
+    return np.sum(np.square((realimage - synthimage)), dtype=float) \
+        + overlap_cost * np.sum(np.square(overlap_map))
+
+
+def dist_objective(realimage, synthimage, distmap, cellmap, overlap_cost):
+    if njit is not None:
+        if realimage.size >= PARALLEL_MIN_PIXELS:
+            return _dist_objective_parallel(realimage, synthimage, distmap, cellmap, overlap_cost)
+        return _dist_objective_serial(realimage, synthimage, distmap, cellmap, overlap_cost)
+    overlap_map = cellmap[cellmap > 1] - 1
+    return np.sum(np.square((realimage - synthimage) * distmap), dtype=float) + overlap_cost * np.sum(np.square(overlap_map))
@@ -8,7 +8,13 @@ from PIL import Image, ImageDraw, ImageFont
 from scipy.ndimage import distance_transform_edt
 from scipy.optimize import leastsq
 
-from cell import Bacilli
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+from cell import BACILLI, Bacilli
+from objective_funcs import objective, dist_objective
 from colony import LineageFrames
 from lineage_funcs import load_colony
 
@@ -22,16 +28,27 @@ is_cell = True
 is_background = False
 
 
-def objective(realimage, synthimage, cellmap, overlap_cost, cell_importance):
-    """Full objective function between two images."""
-    overlap_map = cellmap[cellmap > 1] - 1
-    return np.sum(np.square((realimage - synthimage))) \
-        + overlap_cost * np.sum(np.square(overlap_map))
+def distance_transform(mask):
+    """Euclidean distance from each nonzero pixel of the mask to the nearest zero pixel."""
+    if cv2 is None:
+        return distance_transform_edt(mask).astype(np.float32)
+    return cv2.distanceTransform(mask.astype(np.uint8), cv2.DIST_L2, cv2.DIST_MASK_PRECISE)
 
 
-def dist_objective(realimage, synthimage, distmap, cellmap, overlap_cost):
-    overlap_map = cellmap[cellmap > 1] - 1
-    return np.sum(np.square((realimage - synthimage) * distmap)) + overlap_cost * np.sum(np.square(overlap_map))
+def distance_map(realimage, config, gpu=False):
+    """Per-pixel weights of the distance-based objective for a real image."""
+    divisor = config[f'{config["global.cellType"].lower()}.distanceCostDivisor'] * config['global.pixelsPerMicron']
+    if gpu:
+        import cupy as cp
+        from cucim.core.operations import morphology
+        distmap = morphology.distance_transform_edt(cp.asarray(realimage) < .5, float64_distances=False)
+        distmap /= divisor
+        distmap += 1
+        return cp.asnumpy(distmap)
+    distmap = distance_transform(realimage < .5)
+    distmap /= divisor
+    distmap += 1
+    return distmap
 
 
 def find_optimal_simulation_conf(simulation_config, realimage1, cellnodes):
@@ -40,7 +57,8 @@ def find_optimal_simulation_conf(simulation_config, realimage1, cellnodes):
     def cost(values, target, simulation_config):
         for i in range(len(target)):
             simulation_config[target[i]] = values[i]
-        synthimage, cellmap = generate_synthetic_image(cellnodes, shape, simulation_config)
+        # float32 would swallow the finite-difference steps of leastsq
+        synthimage, cellmap = generate_synthetic_image(cellnodes, shape, simulation_config, dtype=float)
         return (realimage1 - synthimage).flatten()
 
     initial_values = []
@@ -77,31 +95,31 @@ def find_optimal_simulation_conf(simulation_config, realimage1, cellnodes):
     return simulation_config
 
 
-def generate_synthetic_image(cellnodes, shape, simulation_config):
+def generate_synthetic_image(cellnodes, shape, simulation_config, dtype=np.float32):
     image_type = simulation_config["image.type"]
     cellmap = np.zeros(shape, dtype=int)
     if image_type == "graySynthetic" or image_type == "phaseContrast":
         background_color = simulation_config["background.color"]
-        synthimage = np.full(shape, background_color)
+        synthimage = np.full(shape, background_color, dtype=dtype)
         for node in cellnodes:
             node.cell.draw(synthimage, cellmap, is_cell, simulation_config)
         return synthimage, cellmap
     else:
-        synthimage = np.zeros(shape)
+        synthimage = np.zeros(shape, dtype=dtype)
         for node in cellnodes:
             node.cell.draw(synthimage, cellmap, is_cell, simulation_config)
         return synthimage, cellmap
 
 
 def load_image(imagefile):
-    """Open the image file and convert to a floating-point grayscale array."""
+    """Open the image file and convert to a float32 grayscale array."""
     with open(imagefile, 'rb') as fp:
         realimage = np.array(Image.open(fp))
     if realimage.dtype == np.uint8:
-        realimage = realimage.astype(float) / 255
+        realimage = realimage.astype(np.float32) / 255
     if len(realimage.shape) == 3:
-        realimage = np.mean(realimage, axis=-1)
-    return realimage
+        realimage = np.mean(realimage, axis=-1, dtype=np.float32)
+    return realimage.astype(np.float32, copy=False)
 
 
 def perturb_bacilli(node, config, imageshape, invalid_limit=50):
@@ -364,7 +382,7 @@ def optimize_core(imagefile, colony, args, config, iterations_per_cell=3000, aut
     shape = realimage.shape
     simulation_config = config["simulation"]
 
-    celltype = config['global.cellType'].lower()
+    celltype = config['_celltype_tag']
     useDistanceObjective = args.dist
 
     cellnodes = list(colony)
@@ -372,9 +390,7 @@ def optimize_core(imagefile, colony, args, config, iterations_per_cell=3000, aut
     # find the initial cost
     synthimage, cellmap = generate_synthetic_image(cellnodes, shape, simulation_config)
     if useDistanceObjective:
-        distmap = distance_transform_edt(realimage < .5)
-        distmap /= config[f'{celltype}.distanceCostDivisor'] * config['global.pixelsPerMicron']
-        distmap += 1
+        distmap = distance_map(realimage, config, args.gpu)
         cost = dist_objective(realimage, synthimage, distmap, cellmap, config["overlap.cost"])
     else:
         cost = objective(realimage, synthimage, cellmap, config["overlap.cost"], config["cell.importance"])
@@ -400,7 +416,7 @@ def optimize_core(imagefile, colony, args, config, iterations_per_cell=3000, aut
         node = cellnodes[index]
 
         # perturb the cell and push it onto the stack
-        if celltype == 'bacilli':
+        if celltype == BACILLI:
             perturb_bacilli(node, config, shape)
             new_node = node.children[0]
 
@@ -723,7 +739,7 @@ def update_cost_diff(colony, cost_diff):
     return cost_diff
 
 
-def local_optimize(imagefiles, config, args, lineagefile, client):
+def local_optimize(imagefiles, config, args, lineagewriter, client):
     lineageframes = LineageFrames()
     colony = lineageframes.forward()
     if args.lineage_file:
@@ -731,7 +747,7 @@ def local_optimize(imagefiles, config, args, lineagefile, client):
     else:
         load_colony(colony, args.initial, config)
     cost_diff = (-1, -1)
-    celltype = config['global.cellType'].lower()
+    celltype = config['_celltype_tag']
 
     config["simulation"] = find_optimal_simulation_conf(config["simulation"], load_image(imagefiles[0]), list(colony))
     if args.auto_temp == 1:
@@ -785,11 +801,11 @@ def local_optimize(imagefiles, config, args, lineagefile, client):
 
         for cellnode in colony:
             properties = [imagefile.name, cellnode.cell.name]
-            if celltype == 'bacilli':
+            if celltype == BACILLI:
                 properties.extend([
                     str(cellnode.cell.x),
                     str(cellnode.cell.y),
                     str(cellnode.cell.width),
                     str(cellnode.cell.length),
                     str(cellnode.cell.rotation)])
-            print(','.join(properties), file=lineagefile)
+            lineagewriter.writerow(properties)